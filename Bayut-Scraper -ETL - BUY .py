@@ -1,25 +1,97 @@
+import asyncio
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import time
-import json
 from datetime import datetime
 import pandas as pd
-from typing import List, Dict, Any
+import pyarrow as pa
+import pyarrow.csv as pv
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import logging
 import os
-import glob
+
+# Level-1 location externalID of Dubai, used to filter listings server-side
+DUBAI_LOCATION_ID = "5002"
+
+# Algolia only paginates through the first 1000 hits of a query
+ALGOLIA_HITS_CAP = 1000
+
+# Upper bound of the price bisection. The top price range has no upper limit,
+# so listings priced above it are still scraped.
+MAX_PRICE = 1_000_000_000
+
+# Low-cardinality text columns, stored as pandas categoricals
+CATEGORY_COLUMNS = [
+    'CityName', 'DistrictName', 'NeighborhoodName', 'AgencyName', 'purpose',
+    'rentFrequency', 'furnishingStatus', 'completionStatus', 'CategoryTypeName',
+    'CategorySubtypeName'
+]
+
+
+def split_levels(entries: Optional[List[Dict]]) -> Dict[Any, Tuple[Any, Any]]:
+    """Map each level of a 'location' or 'category' list to its (externalID, name)."""
+    return {
+        entry.get('level'): (entry.get('externalID'), entry.get('name'))
+        for entry in entries or []
+    }
+
+
+class RateLimiter:
+    def __init__(self, requests_per_second: float):
+        """Space out async requests evenly, using the monotonic clock."""
+        self.interval = 1.0 / requests_per_second
+        self._next_slot = time.monotonic()
+
+    async def acquire(self):
+        """Wait until the next request slot is available."""
+        now = time.monotonic()
+        delay = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
 
 class MagnoliaScraper:
-    def __init__(self, app_id: str, api_key: str, index_name: str):
+    def __init__(self,
+                 app_id: str,
+                 api_key: str,
+                 index_name: str,
+                 max_concurrency: int = 10,
+                 requests_per_second: float = 10):
         """Initialize the Magnolia scraper with Algolia credentials."""
         self.app_id = app_id
         self.api_key = api_key
         self.index_name = index_name
         self.base_url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/query"
+        self.browse_url = (
+            f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/browse"
+        )
         self.headers = {
             'X-Algolia-API-Key': api_key,
             'X-Algolia-Application-Id': app_id,
             'Content-Type': 'application/json'
         }
+        # Upper bound on in-flight requests and request rate for the async scraper
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+        # Create output directory if it doesn't exist
+        os.makedirs('output/Bayut', exist_ok=True)
+
+        # Reuse pooled keep-alive connections; retries with backoff on 429/5xx
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=50, max_retries=retry)
+        self.session.mount("https://", adapter)
 
         # Set up logging
         logging.basicConfig(
@@ -28,254 +100,386 @@ class MagnoliaScraper:
         )
         self.logger = logging.getLogger(__name__)
 
-        # Create output directory if it doesn't exist
-        os.makedirs('output/Bayut', exist_ok=True)
-
-    def _make_request(self, payload: Dict) -> Dict:
-        """Make a request to the Algolia API with rate limiting and error handling."""
+    def _make_request(self, payload: Dict, url: Optional[str] = None) -> Dict:
+        """Make a request to the Algolia API; the session retries on 429/5xx."""
+        response = self.session.post(
+            url or self.base_url,
+            headers=self.headers,
+            json=payload
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    async def _fetch(self,
+                     client: httpx.AsyncClient,
+                     semaphore: asyncio.Semaphore,
+                     payload: Dict) -> Dict:
+        """Make an async request to the Algolia API, bounded by the shared limits."""
         max_retries = 3
         retry_delay = 2
 
         for attempt in range(max_retries):
             try:
-                response = requests.post(
-                    self.base_url,
-                    headers=self.headers,
-                    json=payload
-                )
+                async with semaphore:
+                    await self.rate_limiter.acquire()
+                    response = await client.post(
+                        self.base_url,
+                        headers=self.headers,
+                        json=payload
+                    )
+
+                # On 429, wait as long as the server asks before retrying
+                if response.status_code == 429 and attempt < max_retries - 1:
+                    try:
+                        delay = float(response.headers.get('Retry-After', retry_delay))
+                    except ValueError:
+                        delay = retry_delay
+                    self.logger.warning(
+                        f"Rate limited (attempt {attempt + 1}/{max_retries}), "
+                        f"retrying in {delay}s"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+
                 response.raise_for_status()
-                return response.json()
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"Request failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
+                return orjson.loads(response.content)
+            except httpx.HTTPError as e:
+                self.logger.error(
+                    f"Request failed (attempt {attempt + 1}/{max_retries}): {str(e)}"
+                )
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
+                    await asyncio.sleep(retry_delay * (attempt + 1))
                 else:
                     raise
 
-    def scrape_listings(self, 
-                        query: str = "", 
-                        filters: str = "", 
-                        page: int = 0, 
-                        hits_per_page: int = 50) -> List[Dict]:
+    def _browse(self, filters: str, hits_per_page: int = 1000) -> Iterator[List[Dict]]:
         """
-        Scrape property listings with given parameters.
-        
+        Iterate over every matching record with the Algolia browse endpoint.
+
+        Unlike the query endpoint, browse is not capped at 1000 hits; each
+        response carries a ``cursor`` pointing at the next batch.
+
         Args:
-            query: Search query string
             filters: Algolia filters string
-            page: Page number to fetch
-            hits_per_page: Number of results per page
-        
+            hits_per_page: Number of hits per batch (at most 1000)
+
+        Yields:
+            One batch of property listings per request
+        """
+        payload = {
+            "filters": filters,
+            "hitsPerPage": hits_per_page
+        }
+
+        while True:
+            result = self._make_request(payload, url=self.browse_url)
+            yield result.get('hits', [])
+
+            cursor = result.get('cursor')
+            if not cursor:
+                break
+            payload = {"cursor": cursor}
+
+    def browse_scrape(self, filters: str = "purpose:for-rent") -> List[Dict]:
+        """
+        Scrape all matching listings in one linear scan of the browse endpoint.
+
+        Requires an API key with the ``browse`` ACL; otherwise the first
+        request fails with HTTP 403.
+
+        Args:
+            filters: Algolia filters string
+
         Returns:
             List of property listings
         """
+        all_listings = []
+        for batch, listings in enumerate(self._browse(filters), start=1):
+            all_listings.extend(listings)
+            self.logger.info(
+                f"Browsed batch {batch}: {len(all_listings)} listings so far"
+            )
+
+        return all_listings
+
+    async def _scrape_price_range(self,
+                                  client: httpx.AsyncClient,
+                                  semaphore: asyncio.Semaphore,
+                                  filters: str,
+                                  lower: int,
+                                  upper: int,
+                                  max_pages: int,
+                                  hits_per_page: int,
+                                  open_ended: bool = False) -> List[Dict]:
+        """
+        Scrape all listings priced in ``[lower, upper)``.
+
+        The first page is fetched on its own to learn ``nbHits``. If the range
+        holds more hits than Algolia will paginate through, it is split in half
+        and both halves are scraped concurrently; otherwise the remaining pages
+        are requested together with ``asyncio.gather``. A half that fails only
+        loses its own listings.
+
+        Args:
+            client: Shared HTTP client
+            semaphore: Semaphore bounding the number of in-flight requests
+            filters: Algolia filters string shared by all price ranges
+            lower: Inclusive lower price bound
+            upper: Exclusive upper price bound, used only for splitting when
+                ``open_ended`` is set
+            max_pages: Maximum pages to scrape for this price range
+            hits_per_page: Number of hits per page
+            open_ended: Whether the range also covers listings priced at or
+                above ``upper``
+
+        Returns:
+            List of property listings
+
+        Raises:
+            httpx.HTTPError: If the first page of the price range fails
+        """
+        label = f"{lower}+" if open_ended else f"{lower}-{upper}"
+
+        # Built once per price range; each page request only overrides "page".
+        # Concurrent requests need their own copy, so the dict is not mutated.
+        numeric_filters = [f"price>={lower}"]
+        if not open_ended:
+            numeric_filters.append(f"price<{upper}")
         payload = {
-            "query": query,
+            "query": "",
             "filters": filters,
-            "page": page,
+            "numericFilters": numeric_filters,
+            "page": 0,
             "hitsPerPage": hits_per_page
         }
 
         try:
-            result = self._make_request(payload)
-            return result.get('hits', [])
+            first_page = await self._fetch(client, semaphore, payload)
         except Exception as e:
-            self.logger.error(f"Failed to scrape listings: {str(e)}")
-            return []
-
-    def price_range_scrape(self, 
-                            base_filters: str = "purpose:for-rent", 
-                            max_pages: int = 1, 
-                            hits_per_page: int = 50):
+            self.logger.error(f"Error scraping {label} price range: {str(e)}")
+            raise
+
+        nb_hits = first_page.get('nbHits', 0)
+        if nb_hits > ALGOLIA_HITS_CAP:
+            if upper - lower > 1:
+                middle = (lower + upper) // 2
+                self.logger.info(
+                    f"{nb_hits} listings in {label} price range, splitting at {middle}"
+                )
+                halves = await asyncio.gather(
+                    self._scrape_price_range(client, semaphore, filters, lower,
+                                             middle, max_pages, hits_per_page),
+                    self._scrape_price_range(client, semaphore, filters, middle,
+                                             upper, max_pages, hits_per_page,
+                                             open_ended),
+                    return_exceptions=True
+                )
+                # Failed halves have already been logged
+                all_listings = []
+                for half in halves:
+                    if isinstance(half, list):
+                        all_listings.extend(half)
+                return all_listings
+
+            self.logger.warning(
+                f"{nb_hits} listings priced at {lower} exceed the "
+                f"{ALGOLIA_HITS_CAP} hit limit, the rest are skipped"
+            )
+
+        all_listings = list(first_page.get('hits', []))
+
+        nb_pages = min(first_page.get('nbPages', 1), max_pages)
+        results = await asyncio.gather(
+            *(self._fetch(client, semaphore, {**payload, "page": page})
+              for page in range(1, nb_pages)),
+            return_exceptions=True
+        )
+        for page, result in enumerate(results, start=2):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    f"Failed to scrape page {page}/{nb_pages} for {label} range: "
+                    f"{str(result)}"
+                )
+                continue
+            all_listings.extend(result.get('hits', []))
+
+        if all_listings:
+            self.logger.info(
+                f"Scraped {len(all_listings)} listings for {label} price range"
+            )
+        return all_listings
+
+    async def price_range_scrape_async(self,
+                                       base_filters: str = "purpose:for-rent",
+                                       max_pages: int = 1,
+                                       hits_per_page: int = 50,
+                                       max_price: int = MAX_PRICE) -> List[Dict]:
         """
         Scrape listings by dividing into price ranges.
-        
+
+        Starting from ``[0, max_price)``, price ranges are split in half until
+        each one fits under Algolia's hit limit. The top range has no upper
+        price filter, so listings priced at or above ``max_price`` are kept.
+        Price ranges, and the pages within each one, are fetched concurrently
+        over a single HTTP/2 client, with at most ``max_concurrency`` requests
+        in flight.
+
         Args:
             base_filters: Base filters to apply to all queries
             max_pages: Maximum pages to scrape per price range
             hits_per_page: Number of hits per page
-        """
-        # Define price ranges with descriptive labels
-        price_ranges = [
-            {"label": "budget", "filter": "price < 20000"},
-           {"label": "budget2", "filter": "price >= 20001 AND price < 35000"},
-           {"label": "budget3", "filter": "price >= 35001 AND price < 50000"},
-            {"label": "mid_range", "filter": "price >= 50001 AND price < 75000"},
-            {"label": "mid_range2", "filter": "price >= 75001 AND price < 100000"},
-           {"label": "mid_range22", "filter": "price >= 100001 AND price < 120000"},
-           {"label": "mid_range3", "filter": "price >= 120001 AND price < 150001"},
-            {"label": "mid_range4", "filter": "price >= 150001 AND price < 200000"},
-            {"label": "mid_range5", "filter": "price >= 200001 AND price < 250000"},
-            {"label": "mid_range6", "filter": "price >= 250001 AND price < 275000"},
-            {"label": "mid_range7", "filter": "price >= 275001 AND price < 300000"},
-            {"label": "mid_range8", "filter": "price >= 300001 AND price < 400000"},
-            {"label": "mid_range9", "filter": "price >= 400001 AND price < 500000"},
-            {"label": "mid_range10", "filter": "price >= 500001 AND price < 600000"},
-            ##{"label": "mid_range5", "filter": "price >= 200001 AND price < 300000"},
-            #{"label": "luxury", "filter": "price >=  5000000 AND price < 6000000"},
-            #{"label": "luxury2", "filter": "price >= 6000000 AND price < 8000000"},
-            #{"label": "luxury3", "filter": "price >= 8000000 AND price < 10000000"},
-            #{"label": "luxury4", "filter": "price >= 10000000 AND price < 12000000"},
-            #{"label": "luxury5", "filter": "price >= 12000000 AND price < 15000000"},
-            {"label": "ultra_luxury", "filter": "price >= 600001"}
-            #{"label": "test", "filter": "price >= 0"}
-        ]
-
-        # Iterate through price ranges
-        for price_range in price_ranges:
-            try:
-                # Combine base filters with price range filter
-                combined_filter = f"{base_filters} AND {price_range['filter']}"
-                
-                # Output file path
-                output_file = os.path.join(
-                    'output/Bayut', 
-                    #'output/', 
-                    f"bayut_listings_{price_range['label']}_pages_{max_pages}.csv"
-                )
-
-                # Scrape listings for this price range
-                all_listings = []
+            max_price: Upper bound of the price ranges that are split in half
 
-                self.logger.info(f"Scraping {price_range['label']} price range")
+        Returns:
+            List of property listings from all price ranges
 
-                for page in range(max_pages):
-                    self.logger.info(f"Scraping page {page + 1}/{max_pages} for {price_range['label']} range")
-                    
-                    listings = self.scrape_listings(
-                        filters=combined_filter,
-                        page=page,
-                        hits_per_page=hits_per_page
-                    )
+        Raises:
+            httpx.HTTPError: If the first request of the search fails
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency
+        )
 
-                    if not listings:
-                        self.logger.info(f"No more listings found for {price_range['label']} range at page {page + 1}")
-                        break
-
-                    all_listings.extend(listings)
-                    time.sleep(1)  # Rate limiting
-
-                # Save to CSV if listings found
-                if all_listings:
-                    df = pd.DataFrame(all_listings)
-                    df['scrape_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                    # Process the 'geography' column to extract latitude and longitude
-                    df['latitude'] = df['geography'].apply(lambda x: x['lat'] if isinstance(x, dict) and 'lat' in x else None)
-                    df['longitude'] = df['geography'].apply(lambda x: x['lng'] if isinstance(x, dict) and 'lng' in x else None)
-        
-                # Process the 'location' column to extract City, District, and Neighborhood details
-                    def extract_location_details(location, level):
-                        if isinstance(location, list):
-                            for loc in location:
-                                if loc.get('level') == level:
-                                    return loc.get('externalID'), loc.get('name')
-                        return None, None
-        
-                    # Extract City details (level 1)
-                    df['CityCode'], df['CityName'] = zip(*df['location'].apply(lambda loc: extract_location_details(loc, level=1)))
-        
-                    # Extract District details (level 2)
-                    df['DistrictID'], df['DistrictName'] = zip(*df['location'].apply(lambda loc: extract_location_details(loc, level=2)))
-        
-                    # Extract Neighborhood details (level 3)
-                    df['NeighborhoodID'], df['NeighborhoodName'] = zip(*df['location'].apply(lambda loc: extract_location_details(loc, level=3)))
-
-                    # Extract Neighborhood details (level 3)
-                    df['BuildingID'], df['BuildingName'] = zip(*df['location'].apply(lambda loc: extract_location_details(loc, level=4)))
-        
-
-
-                    # Process the 'category' column to extract Category Type and Subtype
-                    def extract_category_details(category, level):
-                        if isinstance(category, list):
-                            for cat in category:
-                                if cat.get('level') == level:
-                                    return cat.get('externalID'), cat.get('name')
-                        return None, None
-
-                    # Extract Category Type (level 0)
-                    df['CategoryTypeCode'], df['CategoryTypeName'] = zip(*df['category'].apply(lambda cat: extract_category_details(cat, level=0)))
-        
-        
-                    df['CategorySubtypeCode'], df['CategorySubtypeName'] = zip(*df['category'].apply(lambda cat: extract_category_details(cat, level=1)))
-
-
-                    # Extract agency name from 'agency' column
-                    df['AgencyName'] = df['agency'].apply(lambda x: x.get('name') if isinstance(x, dict) and 'name' in x else None)
-        
-        # Extract 'dldBuildingNK' and 'dldPropertySK' from 'extraFields' column
-                    df['DldBuildingNK'] = df['extraFields'].apply(lambda x: x.get('dldBuildingNK') if isinstance(x, dict) and 'dldBuildingNK' in x else None)
-                    df['DldPropertySK'] = df['extraFields'].apply(lambda x: x.get('dldPropertySK') if isinstance(x, dict) and 'dldPropertySK' in x else None)
-
-
-
-
-                    # Convert 'createdAt' column to timestamp
-                    df['createdAt'] = pd.to_datetime(df['createdAt'], unit='s')
-                    df['updatedAt'] = pd.to_datetime(df['updatedAt'], unit='s')
-
-                    # Create 'BayutLink' column using 'externalID'
-                    df['BayutLink'] = df['externalID'].apply(lambda x: f"https://www.bayut.com/property/details-{x}.html" if pd.notnull(x) else None)
-
-
-                    # Rename column 'area' to 'area (sqm)'
-                    df.rename(columns={'area': 'area (sqm)'}, inplace=True)
-                    df.rename(columns={'plotArea': 'plotArea (sqm)'}, inplace=True)
-
-                    # Define the desired columns and their order
-                    desired_columns = [
-                        'objectID', 'DldPropertySK', 'referenceNumber', 'permitNumber', 'title', 'BayutLink', 'purpose', 'price', 'rooms',
-                         'baths', 'area (sqm)', 'plotArea (sqm)', 'furnishingStatus',  'amenities',
-                        'CategoryTypeName', 'CategorySubtypeName', 
-                        'CityName', 'DistrictID', 'DistrictName','NeighborhoodName', 'BuildingName', 'DldBuildingNK', 'latitude', 'longitude', 'createdAt', 
-                        'updatedAt',
-                        'contactName', 'phoneNumber','AgencyName', 
-                        'completionStatus', 'scrape_date']
-
-                    # Retain only the desired columns in the specified order
-                    df = df[desired_columns]
-
-                    df = df[df['CityName'] == 'Dubai']
-
-                    df.to_csv(output_file, index=False)
-                    self.logger.info(f"Successfully saved {len(all_listings)} listings to {output_file}")
-                else:
-                    self.logger.warning(f"No listings found for {price_range['label']} price range")
+        async with httpx.AsyncClient(
+            http2=True, limits=limits, timeout=httpx.Timeout(10.0)
+        ) as client:
+            return await self._scrape_price_range(
+                client,
+                semaphore,
+                filters=base_filters,
+                lower=0,
+                upper=max_price,
+                max_pages=max_pages,
+                hits_per_page=hits_per_page,
+                open_ended=True
+            )
+
+    def save_listings(self, listings: List[Dict], output_file: str) -> int:
+        """
+        Process all scraped listings at once and write them to a single CSV file.
 
-            except Exception as e:
-                self.logger.error(f"Error scraping {price_range['label']} price range: {str(e)}")
+        Args:
+            listings: Raw hits returned by the Algolia API
+            output_file: Path of the CSV file to write
 
+        Returns:
+            Number of rows written
+        """
+        df = self._finalize(listings)
 
+        # Arrow needs one flat type per column, so object columns (nested lists
+        # and dicts, or mixed types) are written in the same string form as before
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].map(str, na_action='ignore')
 
+        # Arrow writes every digit of the timestamp resolution, and pandas
+        # before 3.0 parses epochs to nanoseconds; keep whole seconds as before
+        for column in df.select_dtypes(include='datetime').columns:
+            df[column] = df[column].astype('datetime64[s]')
 
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        write_options = pv.WriteOptions(batch_size=65536)
+        pv.write_csv(table, output_file, write_options=write_options)
+        return len(df)
 
-    @staticmethod
-    def combine_csv_files(input_folder: str, output_file: str):
+    def _finalize(self, listings: List[Dict]) -> pd.DataFrame:
         """
-        Combine all CSV files from the input folder into a single CSV file.
-        
+        Flatten raw Algolia hits into the output columns.
+
         Args:
-            input_folder: Path to the folder containing CSV files to combine.
-            output_file: Path to the consolidated output file.
+            listings: Raw hits returned by the Algolia API
+
+        Returns:
+            DataFrame with the desired columns
         """
-        try:
-            # Get list of all CSV files in the folder
-            csv_files = glob.glob(os.path.join(input_folder, "*.csv"))
-            if not csv_files:
-                logging.warning(f"No CSV files found in folder: {input_folder}")
-                return
-            
-            logging.info(f"Found {len(csv_files)} files to combine.")
-
-            # Read and concatenate all files
-            combined_df = pd.concat([pd.read_csv(file) for file in csv_files], ignore_index=True)
-            
-            # Save the combined DataFrame to the output file
-            combined_df.to_csv(output_file, index=False)
-            logging.info(f"Successfully combined files into {output_file}")
-        except Exception as e:
-            logging.error(f"Failed to combine CSV files: {str(e)}")
+        df = pd.DataFrame(listings)
+        df['scrape_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        # Extract latitude and longitude from 'geography'
+        geography = [hit.get('geography') or {} for hit in listings]
+        df['latitude'] = [geo.get('lat') for geo in geography]
+        df['longitude'] = [geo.get('lng') for geo in geography]
+
+        # Resolve the 'location' and 'category' entries of each hit by level,
+        # in a single pass
+        loc_levels = [split_levels(hit.get('location')) for hit in listings]
+        cat_levels = [split_levels(hit.get('category')) for hit in listings]
+
+        # Extract City (level 1), District (level 2), Neighborhood (level 3) and
+        # Building (level 4) details
+        location_columns = {
+            1: ['CityCode', 'CityName'],
+            2: ['DistrictID', 'DistrictName'],
+            3: ['NeighborhoodID', 'NeighborhoodName'],
+            4: ['BuildingID', 'BuildingName'],
+        }
+        for level, columns in location_columns.items():
+            df[columns] = pd.DataFrame(
+                [levels.get(level, (None, None)) for levels in loc_levels],
+                columns=columns,
+                index=df.index
+            )
+
+        # Extract Category Type (level 0) and Subtype (level 1)
+        category_columns = {
+            0: ['CategoryTypeCode', 'CategoryTypeName'],
+            1: ['CategorySubtypeCode', 'CategorySubtypeName'],
+        }
+        for level, columns in category_columns.items():
+            df[columns] = pd.DataFrame(
+                [levels.get(level, (None, None)) for levels in cat_levels],
+                columns=columns,
+                index=df.index
+            )
+
+        # Extract agency name from 'agency'
+        df['AgencyName'] = [(hit.get('agency') or {}).get('name') for hit in listings]
+
+        # Extract 'dldBuildingNK' and 'dldPropertySK' from 'extraFields'
+        extra_fields = [hit.get('extraFields') or {} for hit in listings]
+        df['DldBuildingNK'] = [extra.get('dldBuildingNK') for extra in extra_fields]
+        df['DldPropertySK'] = [extra.get('dldPropertySK') for extra in extra_fields]
+
+        # Convert 'createdAt' and 'updatedAt' columns to timestamps. Source fields
+        # that no hit carries are left out here and come back empty from reindex.
+        for column in ('createdAt', 'updatedAt'):
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], unit='s')
+
+        # Create 'BayutLink' column using 'externalID'
+        if 'externalID' in df.columns:
+            df['BayutLink'] = (
+                "https://www.bayut.com/property/details-"
+                + df['externalID'].astype(str)
+                + ".html"
+            ).where(df['externalID'].notna())
+
+        # Rename column 'area' to 'area (sqm)'
+        df.rename(columns={'area': 'area (sqm)'}, inplace=True)
+        df.rename(columns={'plotArea': 'plotArea (sqm)'}, inplace=True)
+
+        # Define the desired columns and their order
+        desired_columns = [
+            'objectID', 'DldPropertySK', 'referenceNumber', 'permitNumber', 'title',
+            'BayutLink', 'purpose', 'price', 'rooms',
+            'baths', 'area (sqm)', 'plotArea (sqm)', 'furnishingStatus', 'amenities',
+            'CategoryTypeName', 'CategorySubtypeName',
+            'CityName', 'DistrictID', 'DistrictName', 'NeighborhoodName',
+            'BuildingName', 'DldBuildingNK', 'latitude', 'longitude',
+            'createdAt', 'updatedAt',
+            'contactName', 'phoneNumber', 'AgencyName',
+            'completionStatus', 'scrape_date']
+
+        # Retain only the desired columns in the specified order; columns that
+        # no hit carried (e.g. 'plotArea') are written out empty
+        df = df.reindex(columns=desired_columns).astype(
+            {column: 'category'
+             for column in CATEGORY_COLUMNS if column in desired_columns}
+        )
+
+        return df
 
 
 def main():
@@ -286,22 +490,36 @@ def main():
         index_name="bayut-production-ads-city-level-score-en"
     )
     
-    # Scrape listings with price range pagination
-    scraper.price_range_scrape(
-        base_filters="purpose:for-rent",
-        max_pages=1000,  # Adjust as needed
-        hits_per_page=50
-    )
-
-    # Combine all CSV files in the output folder
+    # Generate the file name with the current date
     output_folder = "output/Bayut"
     #output_folder = "output/"
-
-    # Generate the file name with the current date
     scraping_date = datetime.now().strftime('%Y-%m-%d')
     output_file = os.path.join(output_folder, f"Bayut-all_listings-rent_{scraping_date}.csv")
 
-    scraper.combine_csv_files(input_folder=output_folder, output_file=output_file)
+    filters = f'purpose:for-rent AND location.externalID:"{DUBAI_LOCATION_ID}"'
+
+    # Scrape listings. Browse covers the whole index in one pass; keys without
+    # the browse ACL fall back to price range pagination.
+    try:
+        listings = scraper.browse_scrape(filters=filters)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 403:
+            raise
+        scraper.logger.warning(
+            "Browse is not permitted for this API key, falling back to price ranges"
+        )
+        listings = asyncio.run(scraper.price_range_scrape_async(
+            base_filters=filters,
+            max_pages=1000,  # Adjust as needed
+            hits_per_page=50
+        ))
+
+    # Build one DataFrame from all scraped listings and write a single file
+    if listings:
+        rows = scraper.save_listings(listings, output_file)
+        scraper.logger.info(f"Saved {rows} listings to {output_file}")
+    else:
+        scraper.logger.warning("No listings found")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
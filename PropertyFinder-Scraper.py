@@ -1,10 +1,25 @@
+import argparse
+from contextlib import nullcontext
+from datetime import timedelta
 import pandas as pd
-import requests
-import json
-from bs4 import BeautifulSoup
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import os
+import re
 import time
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
+# Minimum spacing between page requests; 429 responses are additionally
+# retried by the session after the server's Retry-After delay
+MIN_REQUEST_INTERVAL = 1.0
+
+# Matches the Next.js data island embedded in every search results page
+_NEXT_DATA_RE = re.compile(
+    rb'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+
 
 def adjust_url_for_pagination(base_url, page_number):
     """Adjust the URL for pagination."""
@@ -15,18 +30,39 @@ def adjust_url_for_pagination(base_url, page_number):
     return urlunparse(url_parts)
 
 
-def fetch_listings_from_page(base_url, page_number, headers):
-    """Fetch property listings from a specific page."""
+def create_session():
+    """Create a cached session that reuses connections and retries on 429/5xx."""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False
+    )
+    session = requests_cache.CachedSession(
+        cache_name="Output/PropertyFinder/.http_cache",
+        backend="sqlite",
+        expire_after=timedelta(minutes=10),
+        cache_control=True
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=50, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_listings_from_page(
+    session, base_url, page_number, headers, force_refresh=False
+):
+    """Fetch property listings from a specific page, bypassing the cache on retries."""
     page_url = adjust_url_for_pagination(base_url, page_number)
-    response = requests.get(page_url, headers=headers)
+    response = session.get(page_url, headers=headers, force_refresh=force_refresh)
     if response.status_code != 200:
         print(f"Failed to retrieve page {page_number}")
         return None
-    soup = BeautifulSoup(response.content, "html.parser")
-    next_data_script = soup.find("script", {"id": "__NEXT_DATA__"})
-    if next_data_script:
-        json_content = next_data_script.string
-        data = json.loads(json_content)
+    if getattr(response, "from_cache", False):
+        print(f"Page {page_number} served from cache")
+    next_data_match = _NEXT_DATA_RE.search(response.content)
+    if next_data_match:
+        data = orjson.loads(next_data_match.group(1))
         page_props = data["props"].get("pageProps", {})
         search_result = page_props.get("searchResult", {})
         listings = search_result.get("listings", [])
@@ -36,7 +72,7 @@ def fetch_listings_from_page(base_url, page_number, headers):
         return None
 
 
-def scrape_properties(base_url):
+def scrape_properties(base_url, use_cache=True):
     """Main function to scrape property data."""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/93.0.4577.82 Safari/537.36',
@@ -45,52 +81,112 @@ def scrape_properties(base_url):
         'Connection': 'keep-alive',
     }
 
+    # Pages are fetched one at a time on purpose: the site soft-blocks bursts
+    # with empty pages, the end of the results is only known from an empty
+    # page, and rows are written in page order
+    session = create_session()
+    next_request_at = time.monotonic()
     page_number = 1
     retry_count = 0
-    all_listings = []
     total_properties = 0
-
-    while True:
-        listings = fetch_listings_from_page(base_url, page_number, headers)
-
-        if not listings:
-            retry_count += 1
-            if retry_count >= 3:
-                print(f"No listings found after 3 retries on page {page_number}. Stopping.")
-                break
-            else:
-                print(f"No listings found on page {page_number}. Retrying ({retry_count}/3)...")
-                time.sleep(2)
-                continue
-
-        retry_count = 0
-        all_listings.extend(listings)
-        total_properties += len(listings)
-
-        print(f"Page {page_number} scraped: {len(listings)} listings found.")
-        print(f"Total properties scraped so far: {total_properties}")
-
-        page_number += 1
-        time.sleep(1)
-
-    if all_listings:
-        # Normalize the JSON data into a Pandas DataFrame
-        df = pd.json_normalize(all_listings)
-
-        # Filter out rows where property.id is null
-        if 'property.id' in df.columns:
-            df = df[df['property.id'].notnull()]
-            print(f"Filtered listings: {len(df)} (after removing rows with null 'property.id')")
-
-        # Save the DataFrame as a CSV file
-        csv_file_path = "Output/PropertyFinder/property_listings-rent-300plus.csv"
-        df.to_csv(csv_file_path, index=False)
+    saved_properties = 0
+
+    # Each page is written as soon as it is scraped; the columns of the first
+    # page fix the CSV header and keys that only appear later are dropped.
+    # Pages go to a temporary file next to the output, which replaces the
+    # previous run's file only once at least one page has been saved.
+    csv_file_path = "Output/PropertyFinder/property_listings-rent-300plus.csv"
+    tmp_file_path = csv_file_path + ".tmp"
+    fieldnames = None
+
+    try:
+        with open(tmp_file_path, "w", buffering=1 << 20, newline="") as csv_file:
+            with nullcontext() if use_cache else session.cache_disabled():
+                while True:
+                    # Only sleep for whatever part of the interval the last
+                    # request did not use up
+                    delay = next_request_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_request_at = time.monotonic() + MIN_REQUEST_INTERVAL
+
+                    # Retries refetch the page instead of replaying the cached response
+                    listings = fetch_listings_from_page(
+                        session,
+                        base_url,
+                        page_number,
+                        headers,
+                        force_refresh=retry_count > 0,
+                    )
+
+                    if not listings:
+                        retry_count += 1
+                        if retry_count >= 3:
+                            print(
+                                f"No listings found after 3 retries on page "
+                                f"{page_number}. Stopping."
+                            )
+                            break
+                        else:
+                            print(
+                                f"No listings found on page {page_number}. "
+                                f"Retrying ({retry_count}/3)..."
+                            )
+                            time.sleep(2)
+                            continue
+
+                    retry_count = 0
+                    total_properties += len(listings)
+
+                    # Normalize the page's JSON data into a Pandas DataFrame
+                    df = pd.json_normalize(listings)
+
+                    # Filter out rows where property.id is null
+                    if 'property.id' in df.columns:
+                        df = df[df['property.id'].notnull()]
+
+                    if fieldnames is None:
+                        fieldnames = list(df.columns)
+                        df.to_csv(csv_file, index=False)
+                    else:
+                        df = df.reindex(columns=fieldnames)
+                        df.to_csv(csv_file, header=False, index=False)
+                    saved_properties += len(df)
+
+                    print(
+                        f"Page {page_number} scraped: {len(listings)} listings found."
+                    )
+                    print(f"Total properties scraped so far: {total_properties}")
+
+                    page_number += 1
+
+        if fieldnames is not None:
+            os.replace(tmp_file_path, csv_file_path)
+    finally:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+
+    if fieldnames is not None:
+        print(
+            f"Filtered listings: {saved_properties} "
+            "(after removing rows with null 'property.id')"
+        )
         print(f"Data saved to {csv_file_path}")
     else:
         print("No data scraped.")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scrape PropertyFinder search results."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk HTTP response cache",
+    )
+    args = parser.parse_args()
+
     # Define the base URL for scraping
     base_url = "https://www.propertyfinder.ae/en/search?c=4&fu=0&rp=y&ob=mr"
-    scrape_properties(base_url)
+    scrape_properties(base_url, use_cache=not args.no_cache)